@@ -4,9 +4,11 @@ augmentation, diminution, time alignment, and palindrome verification.
 """
 
 from typing import TypeVar, Union, List, Tuple, Dict, Optional
+from collections import Counter
 import music21 as m21
 from music21 import stream, note, chord
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 
 StreamType = TypeVar('StreamType', bound=stream.Stream)
 
@@ -2729,88 +2731,101 @@ def detect_motifs(
         True
     """
     motifs = []
-    motif_dict = {}  # Pattern signature -> motif data
+
+    # Each candidate window becomes one row of floats holding its interval
+    # pattern or its pitches, then its rhythms, as the settings require;
+    # rows are padded with inf to a common width, so equal rows are equal
+    # signatures
+    lines = []  # Per part: (pitches, rhythms, offsets, has_interval)
+    rows = []
+    windows = []  # Per row: (part index, start index, length)
+    width = max(max_length, 1)
 
     # Extract all melodic lines from all parts
     for part_idx, part in enumerate(score.parts):
-        notes_list = list(part.flatten().notes)
+        notes_list = [
+            n for n in part.flatten().notes
+            if isinstance(n, (note.Note, chord.Chord))
+        ]
+        pitches = [
+            n.pitch.midi if isinstance(n, note.Note) else max(p.midi for p in n.pitches)
+            for n in notes_list
+        ]
+        rhythms = [float(n.quarterLength) for n in notes_list]
+        offsets = [float(n.offset) for n in notes_list]
+        # An interval leads into every note except a single note that
+        # follows a chord (chords use their highest note)
+        is_chord = np.array([isinstance(n, chord.Chord) for n in notes_list], dtype=bool)
+        has_interval = np.zeros(len(notes_list), dtype=bool)
+        has_interval[1:] = is_chord[1:] | ~is_chord[:-1]
+        lines.append((pitches, rhythms, offsets, has_interval))
 
         if len(notes_list) < min_length:
             continue
 
-        # Try all possible motif lengths
-        for motif_len in range(min_length, min(max_length + 1, len(notes_list) + 1)):
-            # Sliding window through the part
-            for start_idx in range(len(notes_list) - motif_len + 1):
-                motif_notes = notes_list[start_idx:start_idx + motif_len]
-
-                # Extract pattern signature
-                if not motif_notes:
-                    continue
-
-                # Melodic contour (intervals between notes)
-                intervals = []
-                rhythms = []
-                pitches = []
-
-                for i, n in enumerate(motif_notes):
-                    if isinstance(n, note.Note):
-                        pitches.append(n.pitch.midi)
-                        rhythms.append(float(n.quarterLength))
-                        if i > 0 and isinstance(motif_notes[i-1], note.Note):
-                            interval = n.pitch.midi - motif_notes[i-1].pitch.midi
-                            intervals.append(interval)
-                    elif isinstance(n, chord.Chord):
-                        # Use highest note of chord
-                        pitches.append(max(p.midi for p in n.pitches))
-                        rhythms.append(float(n.quarterLength))
-                        if i > 0:
-                            prev_pitch = pitches[i-1]
-                            interval = pitches[i] - prev_pitch
-                            intervals.append(interval)
-
-                if not intervals:
-                    continue
+        pitch_arr = np.array(pitches, dtype=np.float64)
+        rhythm_arr = np.array(rhythms, dtype=np.float64)
+        steps = np.diff(pitch_arr)
+
+        # Try all possible motif lengths (a window needs an interval)
+        for motif_len in range(max(min_length, 2), min(max_length + 1, len(notes_list) + 1)):
+            step_windows = sliding_window_view(steps, motif_len - 1)
+            step_mask = sliding_window_view(has_interval[1:], motif_len - 1)
+
+            # Pack each window's intervals to the left, padding with inf
+            order = np.argsort(~step_mask, axis=1, kind='stable')
+            packed = np.take_along_axis(step_windows, order, axis=1)
+            num_intervals = step_mask.sum(axis=1)
+            packed[np.arange(motif_len - 1) >= num_intervals[:, None]] = np.inf
+
+            # Create signature based on settings
+            if allow_transposition:
+                # Use interval pattern (independent of pitch)
+                columns = [packed, np.full((len(packed), width - motif_len), np.inf)]
+            else:
+                # Use actual pitches
+                columns = [_padded_windows(pitch_arr, motif_len, width)]
+            if not allow_rhythmic_variation:
+                columns.append(_padded_windows(rhythm_arr, motif_len, width))
+
+            keep = np.flatnonzero(num_intervals > 0)
+            rows.append(np.hstack(columns)[keep])
+            windows.extend((part_idx, start, motif_len) for start in keep.tolist())
+
+    if rows:
+        _, first, inverse, counts = np.unique(
+            np.vstack(rows), axis=0, return_index=True, return_inverse=True, return_counts=True
+        )
+        inverse = inverse.ravel()
+        members = np.split(np.argsort(inverse, kind='stable'), np.cumsum(counts)[:-1])
+
+        # Filter by minimum occurrences, keeping first-seen order
+        for group in np.argsort(first, kind='stable'):
+            if counts[group] < min_occurrences:
+                continue
 
-                # Create signature based on settings
-                if allow_transposition:
-                    # Use interval pattern (independent of pitch)
-                    if allow_rhythmic_variation:
-                        signature = tuple(intervals)
-                    else:
-                        signature = (tuple(intervals), tuple(rhythms))
-                else:
-                    # Use actual pitches
-                    if allow_rhythmic_variation:
-                        signature = tuple(pitches)
-                    else:
-                        signature = (tuple(pitches), tuple(rhythms))
-
-                # Record occurrence
-                if signature not in motif_dict:
-                    motif_dict[signature] = {
-                        'intervals': intervals,
-                        'rhythms': rhythms,
-                        'pitches': pitches,
-                        'occurrences': []
-                    }
-
-                motif_dict[signature]['occurrences'].append({
+            occurrences = []
+            for row in members[group].tolist():
+                part_idx, start, motif_len = windows[row]
+                pitches, rhythms, offsets, has_interval = lines[part_idx]
+                occurrences.append({
                     'part': part_idx,
-                    'offset': float(motif_notes[0].offset),
-                    'pitches': pitches,
-                    'duration': sum(rhythms)
+                    'offset': offsets[start],
+                    'pitches': pitches[start:start + motif_len],
+                    'duration': sum(rhythms[start:start + motif_len])
                 })
 
-    # Filter by minimum occurrences
-    for signature, data in motif_dict.items():
-        if len(data['occurrences']) >= min_occurrences:
+            part_idx, start, motif_len = windows[members[group][0]]
+            pitches, rhythms, offsets, has_interval = lines[part_idx]
             motifs.append({
-                'intervals': data['intervals'],
-                'rhythms': data['rhythms'],
-                'example_pitches': data['pitches'],
-                'occurrences': data['occurrences'],
-                'num_occurrences': len(data['occurrences'])
+                'intervals': [
+                    pitches[k] - pitches[k - 1]
+                    for k in range(start + 1, start + motif_len) if has_interval[k]
+                ],
+                'rhythms': rhythms[start:start + motif_len],
+                'example_pitches': occurrences[0]['pitches'],
+                'occurrences': occurrences,
+                'num_occurrences': len(occurrences)
             })
 
     # Sort by frequency
@@ -2827,6 +2842,22 @@ def detect_motifs(
     }
 
 
+def _padded_windows(values: np.ndarray, length: int, width: int) -> np.ndarray:
+    """
+    Build sliding windows of values, padded on the right with inf.
+
+    Args:
+        values: 1-D array to window
+        length: Number of values per window
+        width: Row width after padding (at least ``length``)
+
+    Returns:
+        Array of shape (len(values) - length + 1, width)
+    """
+    windows = sliding_window_view(values, length)
+    return np.hstack([windows, np.full((len(windows), width - length), np.inf)])
+
+
 def identify_melodic_sequences(
     score: stream.Score,
     min_repetitions: int = 2,
@@ -2946,10 +2977,7 @@ def identify_melodic_sequences(
                     })
 
     # Count sequence types
-    type_counts = {}
-    for seq in sequences:
-        seq_type = seq['type']
-        type_counts[seq_type] = type_counts.get(seq_type, 0) + 1
+    type_counts = dict(Counter(seq['type'] for seq in sequences))
 
     return {
         'sequences': sequences,
@@ -3010,109 +3038,52 @@ def detect_imitation_points(
             'imitation_types': {}
         }
 
+    # Features of every min_length window, computed once per voice
+    voice_windows = [_imitation_windows(part, min_length) for part in parts_list]
+
+    # Canonic voices repeat the same windows, so each (subject, answer)
+    # classification is memoized for the duration of this call
+    classifications: Dict[
+        Tuple[Tuple[Tuple[int, ...], Tuple[int, ...], Tuple[float, ...]],
+              Tuple[Tuple[int, ...], Tuple[int, ...], Tuple[float, ...]]],
+        Tuple[Optional[str], float]
+    ] = {}
+
     # Compare each pair of voices
     for i in range(len(parts_list)):
         for j in range(i + 1, len(parts_list)):
-            part1 = parts_list[i]
-            part2 = parts_list[j]
-
-            notes1 = list(part1.flatten().notes)
-            notes2 = list(part2.flatten().notes)
-
-            if len(notes1) < min_length or len(notes2) < min_length:
-                continue
+            windows1 = voice_windows[i]
+            windows2 = voice_windows[j]
+            answer_offsets = np.array([offset for offset, _ in windows2])
 
             # Try each position in part1 as potential subject
-            for start1 in range(len(notes1) - min_length + 1):
-                subject_notes = notes1[start1:start1 + min_length]
-
-                if not all(isinstance(n, note.Note) for n in subject_notes):
+            for subject_offset, subject in windows1:
+                if subject is None:
                     continue
 
-                subject_intervals = []
-                subject_rhythms = []
-                subject_pitches = []
-
-                for k in range(len(subject_notes)):
-                    n = subject_notes[k]
-                    subject_pitches.append(n.pitch.midi)
-                    subject_rhythms.append(float(n.quarterLength))
-                    if k > 0:
-                        subject_intervals.append(
-                            n.pitch.midi - subject_notes[k-1].pitch.midi
-                        )
-
-                subject_offset = float(subject_notes[0].offset)
+                # Answers are in time order, so only the ones starting
+                # within max_delay after the subject can qualify (with a
+                # little slack; the exact check follows)
+                lo = np.searchsorted(answer_offsets, subject_offset, side='left')
+                hi = np.searchsorted(answer_offsets, subject_offset + max_delay + 1e-9, side='right')
 
                 # Look for imitation in part2
-                for start2 in range(len(notes2) - min_length + 1):
-                    answer_notes = notes2[start2:start2 + min_length]
-
-                    if not all(isinstance(n, note.Note) for n in answer_notes):
+                for answer_offset, answer in windows2[lo:hi]:
+                    if answer is None:
                         continue
 
-                    answer_offset = float(answer_notes[0].offset)
                     delay = answer_offset - subject_offset
 
                     # Check delay constraint
                     if delay < 0 or delay > max_delay:
                         continue
 
-                    answer_intervals = []
-                    answer_rhythms = []
-                    answer_pitches = []
-
-                    for k in range(len(answer_notes)):
-                        n = answer_notes[k]
-                        answer_pitches.append(n.pitch.midi)
-                        answer_rhythms.append(float(n.quarterLength))
-                        if k > 0:
-                            answer_intervals.append(
-                                n.pitch.midi - answer_notes[k-1].pitch.midi
-                            )
-
-                    # Classify imitation type
-                    imitation_type = None
-                    similarity = 0.0
-
-                    # Exact imitation (same pitches and rhythms)
-                    if subject_pitches == answer_pitches and subject_rhythms == answer_rhythms:
-                        imitation_type = 'exact'
-                        similarity = 1.0
-
-                    # Tonal imitation (same intervals, different pitches)
-                    elif subject_intervals == answer_intervals and subject_rhythms == answer_rhythms:
-                        imitation_type = 'tonal'
-                        # Calculate similarity based on interval matching
-                        if subject_intervals:
-                            matches = sum(1 for a, b in zip(subject_intervals, answer_intervals) if a == b)
-                            similarity = matches / len(subject_intervals)
-                        else:
-                            similarity = 0.0
-
-                    # Rhythmic imitation (same rhythms, different pitches/intervals)
-                    elif subject_rhythms == answer_rhythms:
-                        imitation_type = 'rhythmic'
-                        if subject_rhythms:
-                            matches = sum(1 for a, b in zip(subject_rhythms, answer_rhythms) if abs(a - b) < 0.01)
-                            similarity = matches / len(subject_rhythms)
-                        else:
-                            similarity = 0.0
-
-                    # Approximate imitation
-                    else:
-                        # Calculate interval similarity
-                        if len(subject_intervals) == len(answer_intervals):
-                            interval_matches = sum(1 for a, b in zip(subject_intervals, answer_intervals) if a == b)
-                            interval_sim = interval_matches / len(subject_intervals) if subject_intervals else 0
-
-                            rhythm_matches = sum(1 for a, b in zip(subject_rhythms, answer_rhythms) if abs(a - b) < 0.01)
-                            rhythm_sim = rhythm_matches / len(subject_rhythms) if subject_rhythms else 0
-
-                            similarity = (interval_sim + rhythm_sim) / 2
-
-                            if similarity >= similarity_threshold:
-                                imitation_type = 'approximate'
+                    key = (subject, answer)
+                    if key not in classifications:
+                        classifications[key] = _classify_imitation(subject, answer)
+                    imitation_type, similarity = classifications[key]
+                    if imitation_type == 'approximate' and similarity < similarity_threshold:
+                        imitation_type = None
 
                     # Record imitation if found
                     if imitation_type and similarity >= similarity_threshold:
@@ -3125,14 +3096,11 @@ def detect_imitation_points(
                             'length': min_length,
                             'type': imitation_type,
                             'similarity': similarity,
-                            'transposition': answer_pitches[0] - subject_pitches[0]
+                            'transposition': answer[0][0] - subject[0][0]
                         })
 
     # Count by type
-    type_counts = {}
-    for im in imitation_points:
-        im_type = im['type']
-        type_counts[im_type] = type_counts.get(im_type, 0) + 1
+    type_counts = dict(Counter(im['type'] for im in imitation_points))
 
     return {
         'imitation_points': imitation_points,
@@ -3141,6 +3109,96 @@ def detect_imitation_points(
     }
 
 
+def _imitation_windows(
+    part: stream.Part,
+    length: int
+) -> List[Tuple[float, Optional[Tuple[Tuple[int, ...], Tuple[int, ...], Tuple[float, ...]]]]]:
+    """
+    Extract the features of every window of consecutive notes in a voice.
+
+    Args:
+        part: The voice to scan
+        length: Number of notes per window
+
+    Returns:
+        List of (offset, features) per window start, where features is a
+        (pitches, intervals, rhythms) tuple, or None if the window holds a
+        chord; empty if the voice has fewer than ``length`` notes
+    """
+    notes_list = list(part.flatten().notes)
+    if len(notes_list) < length:
+        return []
+
+    is_note = [isinstance(n, note.Note) for n in notes_list]
+    # Chords get a placeholder pitch; windows containing them are not compared
+    pitches = [n.pitch.midi if isinstance(n, note.Note) else 0 for n in notes_list]
+    rhythms = [float(n.quarterLength) for n in notes_list]
+
+    windows: List[Tuple[float, Optional[Tuple[Tuple[int, ...], Tuple[int, ...], Tuple[float, ...]]]]] = []
+    for start in range(len(notes_list) - length + 1):
+        offset = float(notes_list[start].offset)
+        if not all(is_note[start:start + length]):
+            windows.append((offset, None))
+            continue
+        window_pitches = tuple(pitches[start:start + length])
+        window_intervals = tuple(
+            window_pitches[k] - window_pitches[k - 1] for k in range(1, length)
+        )
+        windows.append((offset, (window_pitches, window_intervals, tuple(rhythms[start:start + length]))))
+    return windows
+
+
+def _classify_imitation(
+    subject: Tuple[Tuple[int, ...], Tuple[int, ...], Tuple[float, ...]],
+    answer: Tuple[Tuple[int, ...], Tuple[int, ...], Tuple[float, ...]]
+) -> Tuple[Optional[str], float]:
+    """
+    Classify how an answer window imitates a subject window.
+
+    Args:
+        subject: (pitches, intervals, rhythms) of the subject window
+        answer: (pitches, intervals, rhythms) of the answer window
+
+    Returns:
+        Tuple of (imitation type or None, similarity); an 'approximate'
+        match still has to reach the caller's similarity threshold
+    """
+    subject_pitches, subject_intervals, subject_rhythms = subject
+    answer_pitches, answer_intervals, answer_rhythms = answer
+
+    # Exact imitation (same pitches and rhythms)
+    if subject_pitches == answer_pitches and subject_rhythms == answer_rhythms:
+        return 'exact', 1.0
+
+    # Tonal imitation (same intervals, different pitches)
+    if subject_intervals == answer_intervals and subject_rhythms == answer_rhythms:
+        # Calculate similarity based on interval matching
+        if subject_intervals:
+            matches = sum(1 for a, b in zip(subject_intervals, answer_intervals) if a == b)
+            return 'tonal', matches / len(subject_intervals)
+        return 'tonal', 0.0
+
+    # Rhythmic imitation (same rhythms, different pitches/intervals)
+    if subject_rhythms == answer_rhythms:
+        if subject_rhythms:
+            matches = sum(1 for a, b in zip(subject_rhythms, answer_rhythms) if abs(a - b) < 0.01)
+            return 'rhythmic', matches / len(subject_rhythms)
+        return 'rhythmic', 0.0
+
+    # Approximate imitation
+    if len(subject_intervals) == len(answer_intervals):
+        # Calculate interval similarity
+        interval_matches = sum(1 for a, b in zip(subject_intervals, answer_intervals) if a == b)
+        interval_sim = interval_matches / len(subject_intervals) if subject_intervals else 0
+
+        rhythm_matches = sum(1 for a, b in zip(subject_rhythms, answer_rhythms) if abs(a - b) < 0.01)
+        rhythm_sim = rhythm_matches / len(subject_rhythms) if subject_rhythms else 0
+
+        return 'approximate', (interval_sim + rhythm_sim) / 2
+
+    return None, 0.0
+
+
 def analyze_thematic_development(
     score: stream.Score,
     theme: Optional[stream.Stream] = None,
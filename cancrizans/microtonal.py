@@ -7,14 +7,26 @@ xenharmonic canons, and non-Western musical traditions.
 Phase 18 - v0.35.0
 """
 
-from typing import List, Dict, Tuple, Optional, Callable
+from typing import List, Dict, Tuple, Optional, Callable, Sequence, Union
 from dataclasses import dataclass
 from enum import Enum
+from functools import lru_cache
 import math
+import numpy as np
 from music21 import stream, note, pitch, interval
 from music21.pitch import Microtone
 
 
+# 5-limit just intonation chromatic scale (C, C#, D, ... B)
+_FIVE_LIMIT_RATIOS: Tuple[Tuple[int, int], ...] = (
+    (1, 1), (16, 15), (9, 8), (6, 5), (5, 4), (4, 3),
+    (45, 32), (3, 2), (8, 5), (5, 3), (9, 5), (15, 8),
+)
+
+# Circle of fifths: F C G D A E B
+_PYTHAGOREAN_FIFTHS_FROM_C: Tuple[int, ...] = (0, 1, 2, 3, 4, -1, -2)  # C D E F G A B
+
+
 class TuningSystem(Enum):
     """Historical and contemporary tuning systems"""
     EQUAL_12 = "12-tone equal temperament"
@@ -78,7 +90,7 @@ class MicrotonalPitch:
     def __post_init__(self):
         if self.frequency_hz is None:
             # Calculate frequency from MIDI + cents
-            self.frequency_hz = 440.0 * (2 ** ((self.midi_note - 69 + self.cent_deviation / 100.0) / 12.0))
+            self.frequency_hz = 440.0 * math.exp2((self.midi_note - 69 + self.cent_deviation / 100.0) / 12.0)
 
     def to_cents_from_c0(self) -> float:
         """Get pitch in cents from C0"""
@@ -155,6 +167,33 @@ def create_equal_temperament(divisions: int, octave_cents: float = 1200.0) -> Mi
     )
 
 
+@lru_cache(maxsize=128)
+def _ratios_to_cents(ratios: Tuple[Tuple[int, int], ...]) -> Tuple[float, ...]:
+    """
+    Convert (numerator, denominator) ratios to cents in one vectorized pass
+
+    Results are cached by ratio tuple, so factories built on constant ratio
+    tables only pay for the log2 conversion once.
+
+    Raises:
+        ZeroDivisionError: If a denominator is zero
+        ValueError: If a ratio is zero or negative
+    """
+    if not ratios:
+        return ()
+
+    for numerator, denominator in ratios:
+        if denominator == 0:
+            raise ZeroDivisionError("division by zero")
+        if numerator / denominator <= 0:
+            raise ValueError("math domain error")
+
+    num = np.fromiter((n for n, _ in ratios), dtype=np.float64, count=len(ratios))
+    den = np.fromiter((d for _, d in ratios), dtype=np.float64, count=len(ratios))
+
+    return tuple((1200.0 * np.log2(num / den)).tolist())
+
+
 def create_just_intonation_scale(ratios: List[Tuple[int, int]]) -> MicrotonalScale:
     """
     Create scale from just intonation ratios
@@ -170,16 +209,11 @@ def create_just_intonation_scale(ratios: List[Tuple[int, int]]) -> MicrotonalSca
         >>> ratios = [(1, 1), (9, 8), (5, 4), (4, 3), (3, 2), (5, 3), (15, 8)]
         >>> scale = create_just_intonation_scale(ratios)
     """
-    intervals_cents = []
-
-    for num, denom in ratios:
-        ratio = num / denom
-        cents = 1200.0 * math.log2(ratio)
-        intervals_cents.append(cents)
+    intervals_cents = _ratios_to_cents(tuple(tuple(r) for r in ratios))
 
     return MicrotonalScale(
         name="Just Intonation",
-        intervals_cents=intervals_cents,
+        intervals_cents=list(intervals_cents),
         tuning_system=TuningSystem.JUST_INTONATION
     )
 
@@ -194,11 +228,8 @@ def create_pythagorean_scale() -> MicrotonalScale:
     # Build from stacked fifths
     fifth_cents = 1200.0 * math.log2(3/2)
 
-    # Circle of fifths: F C G D A E B
-    fifths_from_c = [0, 1, 2, 3, 4, -1, -2]  # C D E F G A B
-
     intervals = []
-    for fifths in sorted(fifths_from_c):
+    for fifths in sorted(_PYTHAGOREAN_FIFTHS_FROM_C):
         cents = (fifths * fifth_cents) % 1200.0
         intervals.append(cents)
 
@@ -209,6 +240,39 @@ def create_pythagorean_scale() -> MicrotonalScale:
     )
 
 
+# Scale degrees in cents above the tonic for each world music scale type
+_WORLD_SCALE_CENTS: Dict[ScaleType, Tuple[int, ...]] = {
+    # Arabic Maqamat (approximate quarter tones)
+    ScaleType.MAQAM_RAST: (0, 200, 350, 500, 700, 900, 1050),
+    ScaleType.MAQAM_BAYATI: (0, 150, 300, 500, 700, 850, 1000),
+    ScaleType.MAQAM_HIJAZ: (0, 100, 400, 500, 700, 800, 1100),
+    ScaleType.MAQAM_SABA: (0, 150, 300, 400, 600, 850, 1000),
+    ScaleType.MAQAM_NAHAWAND: (0, 200, 300, 500, 700, 800, 1000),
+
+    # Indian Ragas (approximate)
+    ScaleType.RAGA_BHAIRAV: (0, 100, 400, 500, 700, 800, 1100),
+    ScaleType.RAGA_YAMAN: (0, 200, 400, 600, 700, 900, 1100),
+    ScaleType.RAGA_TODI: (0, 100, 300, 600, 700, 800, 1100),
+    ScaleType.RAGA_BHAIRAVI: (0, 100, 300, 500, 700, 800, 1000),
+
+    # Javanese (very approximate - actual gamelan tuning varies)
+    ScaleType.PELOG: (0, 136, 384, 600, 816, 1032),  # 5-note approximation
+    ScaleType.SLENDRO: (0, 240, 480, 720, 960),  # 5-note equal divisions
+
+    # Japanese
+    ScaleType.HIRAJOSHI: (0, 200, 300, 700, 800),
+    ScaleType.INSEN: (0, 100, 500, 700, 1000),
+    ScaleType.IWATO: (0, 100, 500, 600, 1000),
+
+    # Chinese
+    ScaleType.PENTATONIC_CHINESE: (0, 200, 400, 700, 900),
+
+    # Persian
+    ScaleType.DASTGAH_SHUR: (0, 150, 350, 500, 700, 850, 1050),
+    ScaleType.DASTGAH_HOMAYUN: (0, 150, 350, 450, 700, 800, 1050),
+}
+
+
 def create_world_music_scale(scale_type: ScaleType, tonic_midi: int = 60) -> MicrotonalScale:
     """
     Create world music scale
@@ -220,43 +284,12 @@ def create_world_music_scale(scale_type: ScaleType, tonic_midi: int = 60) -> Mic
     Returns:
         Microtonal scale
     """
-    scale_definitions = {
-        # Arabic Maqamat (approximate quarter tones)
-        ScaleType.MAQAM_RAST: [0, 200, 350, 500, 700, 900, 1050],
-        ScaleType.MAQAM_BAYATI: [0, 150, 300, 500, 700, 850, 1000],
-        ScaleType.MAQAM_HIJAZ: [0, 100, 400, 500, 700, 800, 1100],
-        ScaleType.MAQAM_SABA: [0, 150, 300, 400, 600, 850, 1000],
-        ScaleType.MAQAM_NAHAWAND: [0, 200, 300, 500, 700, 800, 1000],
-
-        # Indian Ragas (approximate)
-        ScaleType.RAGA_BHAIRAV: [0, 100, 400, 500, 700, 800, 1100],
-        ScaleType.RAGA_YAMAN: [0, 200, 400, 600, 700, 900, 1100],
-        ScaleType.RAGA_TODI: [0, 100, 300, 600, 700, 800, 1100],
-        ScaleType.RAGA_BHAIRAVI: [0, 100, 300, 500, 700, 800, 1000],
-
-        # Javanese (very approximate - actual gamelan tuning varies)
-        ScaleType.PELOG: [0, 136, 384, 600, 816, 1032],  # 5-note approximation
-        ScaleType.SLENDRO: [0, 240, 480, 720, 960],  # 5-note equal divisions
-
-        # Japanese
-        ScaleType.HIRAJOSHI: [0, 200, 300, 700, 800],
-        ScaleType.INSEN: [0, 100, 500, 700, 1000],
-        ScaleType.IWATO: [0, 100, 500, 600, 1000],
-
-        # Chinese
-        ScaleType.PENTATONIC_CHINESE: [0, 200, 400, 700, 900],
-
-        # Persian
-        ScaleType.DASTGAH_SHUR: [0, 150, 350, 500, 700, 850, 1050],
-        ScaleType.DASTGAH_HOMAYUN: [0, 150, 350, 450, 700, 800, 1050],
-    }
-
-    if scale_type not in scale_definitions:
+    if scale_type not in _WORLD_SCALE_CENTS:
         raise ValueError(f"Unknown scale type: {scale_type}")
 
     return MicrotonalScale(
         name=scale_type.value,
-        intervals_cents=scale_definitions[scale_type],
+        intervals_cents=list(_WORLD_SCALE_CENTS[scale_type]),
         tonic_midi=tonic_midi
     )
 
@@ -333,24 +366,29 @@ def microtonal_inversion(
         Inverted stream
     """
     pitches = scale.get_pitches(octaves=8)
-    pitch_cents = [p.to_cents_from_c0() for p in pitches]
+    pitch_cents = np.fromiter(
+        (p.to_cents_from_c0() for p in pitches), dtype=np.float64, count=len(pitches)
+    )
 
     if axis_cents is None:
-        axis_cents = (min(pitch_cents) + max(pitch_cents)) / 2.0
+        axis_cents = float(pitch_cents.min() + pitch_cents.max()) / 2.0
 
-    result = stream.Stream()
+    elements = list(s.flatten().notesAndRests)
 
-    for element in s.flatten().notesAndRests:
-        if isinstance(element, note.Note):
-            # Get current pitch in cents
-            current_cents = element.pitch.midi * 100.0 + element.pitch.microtone.cents
+    # Get current pitches in cents, invert around axis and find the closest
+    # scale degree for every note in one search
+    current_cents = np.fromiter(
+        (e.pitch.midi * 100.0 + e.pitch.microtone.cents
+         for e in elements if isinstance(e, note.Note)),
+        dtype=np.float64
+    )
+    closest_indices = iter(_nearest_index(pitch_cents, 2 * axis_cents - current_cents).tolist())
 
-            # Invert around axis
-            inverted_cents = 2 * axis_cents - current_cents
+    result = stream.Stream()
 
-            # Find closest scale degree
-            closest_idx = min(range(len(pitch_cents)), key=lambda i: abs(pitch_cents[i] - inverted_cents))
-            closest_pitch = pitches[closest_idx]
+    for element in elements:
+        if isinstance(element, note.Note):
+            closest_pitch = pitches[next(closest_indices)]
 
             n = note.Note()
             n.pitch.midi = closest_pitch.midi_note
@@ -365,33 +403,34 @@ def microtonal_inversion(
     return result
 
 
-def analyze_microtonal_intervals(s: stream.Stream) -> Dict[str, any]:
+def _stream_notes(s: Union[stream.Stream, Sequence[note.NotRest]]) -> Sequence[note.NotRest]:
+    """Flatten a stream to its notes, passing precomputed note lists through"""
+    if isinstance(s, stream.Stream):
+        return list(s.flatten().notes)
+    return s
+
+
+def analyze_microtonal_intervals(s: Union[stream.Stream, Sequence[note.NotRest]]) -> Dict[str, any]:
     """
     Analyze microtonal intervals in stream
 
     Args:
-        s: Stream to analyze
+        s: Stream to analyze, or a precomputed list of its notes
 
     Returns:
         Dictionary with interval analysis
     """
-    intervals_cents = []
-    notes = list(s.flatten().notes)
+    notes = _stream_notes(s)
+    pitches = [n.pitch for n in notes]
+    microtones = np.fromiter((p.microtone.cents for p in pitches), dtype=np.float64, count=len(pitches))
+    midi = np.fromiter((p.midi for p in pitches), dtype=np.float64, count=len(pitches))
 
     # Check if any notes have microtonal deviations (even with one note)
-    contains_microtones = any(abs(n.pitch.microtone.cents) > 1.0 for n in notes)
-
-    for i in range(len(notes) - 1):
-        n1 = notes[i]
-        n2 = notes[i + 1]
+    contains_microtones = bool(np.any(np.abs(microtones) > 1.0))
 
-        cents1 = n1.pitch.midi * 100.0 + n1.pitch.microtone.cents
-        cents2 = n2.pitch.midi * 100.0 + n2.pitch.microtone.cents
+    intervals_cents = np.abs(np.diff(midi * 100.0 + microtones))
 
-        interval_cents = abs(cents2 - cents1)
-        intervals_cents.append(interval_cents)
-
-    if not intervals_cents:
+    if intervals_cents.size == 0:
         return {
             'interval_count': 0,
             'smallest_interval_cents': 0,
@@ -401,15 +440,15 @@ def analyze_microtonal_intervals(s: stream.Stream) -> Dict[str, any]:
         }
 
     return {
-        'interval_count': len(intervals_cents),
-        'smallest_interval_cents': min(intervals_cents),
-        'largest_interval_cents': max(intervals_cents),
-        'average_interval_cents': sum(intervals_cents) / len(intervals_cents),
+        'interval_count': int(intervals_cents.size),
+        'smallest_interval_cents': float(intervals_cents.min()),
+        'largest_interval_cents': float(intervals_cents.max()),
+        'average_interval_cents': float(intervals_cents.mean()),
         'contains_microtones': contains_microtones,
         'interval_distribution': {
-            'micro_intervals': sum(1 for i in intervals_cents if i < 100),  # < semitone
-            'semitones': sum(1 for i in intervals_cents if 90 <= i < 110),
-            'large_intervals': sum(1 for i in intervals_cents if i >= 200)
+            'micro_intervals': int(np.count_nonzero(intervals_cents < 100)),  # < semitone
+            'semitones': int(np.count_nonzero((intervals_cents >= 90) & (intervals_cents < 110))),
+            'large_intervals': int(np.count_nonzero(intervals_cents >= 200))
         }
     }
 
@@ -451,12 +490,9 @@ def gamma_scale(tonic_midi: int = 60) -> MicrotonalScale:
     divisions = 20.5
     step_cents = 1200.0 / divisions
 
-    # Generate scale degrees
-    intervals = []
-    current = 0.0
-    while current < 1200.0:
-        intervals.append(current)
-        current += step_cents
+    # Generate scale degrees below the octave
+    num_degrees = math.ceil(1200.0 / step_cents)
+    intervals = [i * step_cents for i in range(num_degrees)]
 
     return MicrotonalScale(
         name="Gamma Scale (Carlos)",
@@ -465,51 +501,136 @@ def gamma_scale(tonic_midi: int = 60) -> MicrotonalScale:
     )
 
 
-def detect_tuning_system(s: stream.Stream) -> Tuple[TuningSystem, float]:
+def _reference_cents(intervals_cents: Union[Sequence[float], np.ndarray]) -> np.ndarray:
+    """Build a sorted, read-only cents array for nearest-pitch searches"""
+    arr = np.sort(np.asarray(intervals_cents, dtype=np.float64))
+    arr.flags.writeable = False
+    return arr
+
+
+# Reference pitch classes for tuning detection, built once at import
+_TET12_CENTS = _reference_cents([i * 100.0 for i in range(12)])
+_PYTHAGOREAN_CENTS = _reference_cents(create_pythagorean_scale().intervals_cents)
+_FIVE_LIMIT_CENTS = _reference_cents(create_just_intonation_scale(list(_FIVE_LIMIT_RATIOS)).intervals_cents)
+
+# Candidate tunings for detect_tuning_system, in tie-breaking order
+_DETECTABLE_TUNINGS: Tuple[TuningSystem, ...] = (
+    TuningSystem.EQUAL_12,
+    TuningSystem.PYTHAGOREAN,
+    TuningSystem.JUST_INTONATION,
+)
+_DETECTABLE_TUNING_CENTS: Tuple[np.ndarray, ...] = (
+    _TET12_CENTS,
+    _PYTHAGOREAN_CENTS,
+    _FIVE_LIMIT_CENTS,
+)
+
+
+# World scale types in definition order
+_WORLD_SCALE_TYPES: Tuple[ScaleType, ...] = tuple(_WORLD_SCALE_CENTS)
+
+
+@lru_cache(maxsize=None)
+def _world_scale_pitch_classes(scale_type: ScaleType) -> np.ndarray:
+    """Sorted, read-only pitch classes (cents mod 1200) of a world music scale"""
+    intervals = create_world_music_scale(scale_type).intervals_cents
+    return _reference_cents(np.mod(intervals, 1200.0))
+
+
+def _nearest_distance(values: np.ndarray, reference: np.ndarray) -> np.ndarray:
+    """
+    Distance from each value to the closest entry of a sorted reference array
+
+    Uses binary search, so the cost is O(N log M) rather than O(N * M).
+
+    Args:
+        values: Values to look up
+        reference: Sorted reference array (must be non-empty)
+
+    Returns:
+        Array of absolute distances, one per value
+    """
+    last = len(reference) - 1
+    idx = np.searchsorted(reference, values)
+    left = reference[np.clip(idx - 1, 0, last)]
+    right = reference[np.clip(idx, 0, last)]
+    distances: np.ndarray = np.minimum(np.abs(values - left), np.abs(values - right))
+    return distances
+
+
+def _nearest_index(reference: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """
+    Index of the closest reference entry for each value
+
+    The reference array does not need to be sorted. Ties go to the entry
+    that comes first in the reference, matching a linear ``min`` scan.
+
+    Args:
+        reference: Candidate values (must be non-empty)
+        values: Values to look up
+
+    Returns:
+        Integer array of indices into ``reference``, one per value
+    """
+    order = np.argsort(reference, kind='stable')
+    sorted_ref = reference[order]
+    last = len(sorted_ref) - 1
+
+    right = np.clip(np.searchsorted(sorted_ref, values), 0, last)
+    left = np.clip(right - 1, 0, last)
+    left_dist = np.abs(values - sorted_ref[left])
+    right_dist = np.abs(values - sorted_ref[right])
+
+    use_right = (right_dist < left_dist) | ((right_dist == left_dist) & (order[right] < order[left]))
+    return order[np.where(use_right, right, left)]
+
+
+def _pitch_class_cents(notes: Sequence[note.NotRest]) -> np.ndarray:
+    """
+    Extract pitch classes in cents (0-1200 plus microtone) in a single pass
+
+    Args:
+        notes: Notes to read
+
+    Returns:
+        Float array with one entry per note
+    """
+    pitches = (n.pitch for n in notes)
+    return np.fromiter(
+        ((p.midi % 12) * 100.0 + p.microtone.cents for p in pitches),
+        dtype=np.float64,
+        count=len(notes)
+    )
+
+
+def detect_tuning_system(s: Union[stream.Stream, Sequence[note.NotRest]]) -> Tuple[TuningSystem, float]:
     """
     Detect most likely tuning system used in stream
 
     Args:
-        s: Stream to analyze
+        s: Stream to analyze, or a precomputed list of its notes
 
     Returns:
         Tuple of (detected tuning system, confidence score 0-1)
     """
-    notes = list(s.flatten().notes)
+    notes = _stream_notes(s)
 
     if not notes:
         return TuningSystem.EQUAL_12, 0.0
 
     # Get all pitch classes in cents
-    pitch_cents = []
-    for n in notes:
-        cents = (n.pitch.midi % 12) * 100.0 + n.pitch.microtone.cents
-        pitch_cents.append(cents)
-
-    # Test against different tuning systems
-    scores = {}
-
-    # 12-TET
-    tet12_errors = [min(abs(cents - (i * 100)) for i in range(12)) for cents in pitch_cents]
-    scores[TuningSystem.EQUAL_12] = 1.0 - (sum(tet12_errors) / (len(tet12_errors) * 50.0))
-
-    # Pythagorean
-    pyth_scale = create_pythagorean_scale()
-    pyth_cents = pyth_scale.intervals_cents
-    pyth_errors = [min(abs(cents - pc) for pc in pyth_cents) for cents in pitch_cents]
-    scores[TuningSystem.PYTHAGOREAN] = 1.0 - (sum(pyth_errors) / (len(pyth_errors) * 50.0))
-
-    # Just Intonation (5-limit)
-    just_ratios = [(1, 1), (16, 15), (9, 8), (6, 5), (5, 4), (4, 3),
-                   (45, 32), (3, 2), (8, 5), (5, 3), (9, 5), (15, 8)]
-    just_scale = create_just_intonation_scale(just_ratios)
-    just_cents = just_scale.intervals_cents
-    just_errors = [min(abs(cents - jc) for jc in just_cents) for cents in pitch_cents]
-    scores[TuningSystem.JUST_INTONATION] = 1.0 - (sum(just_errors) / (len(just_errors) * 50.0))
+    pitch_cents = _pitch_class_cents(notes)
+
+    # Test against different tuning systems (12-TET, Pythagorean, 5-limit just)
+    scores = np.empty(len(_DETECTABLE_TUNINGS))
+    for k, reference in enumerate(_DETECTABLE_TUNING_CENTS):
+        errors = _nearest_distance(pitch_cents, reference)
+        scores[k] = 1.0 - errors.mean() / 50.0
 
     # Find best match
-    best_system = max(scores, key=scores.get)
-    confidence = max(0.0, min(1.0, scores[best_system]))
+    best_idx = int(scores.argmax())
+    best_system = _DETECTABLE_TUNINGS[best_idx]
+    confidence = float(np.clip(scores[best_idx], 0.0, 1.0))
 
     return best_system, confidence
 
@@ -532,40 +653,42 @@ def cross_cultural_canon_analysis(s: stream.Stream) -> Dict[str, any]:
         'interval_characteristics': {}
     }
 
+    # Flatten once and share the notes with every analysis step
+    notes = list(s.flatten().notes)
+
     # Detect tuning
-    tuning, confidence = detect_tuning_system(s)
+    tuning, confidence = detect_tuning_system(notes)
     analysis['tuning_system'] = tuning.value
     analysis['tuning_confidence'] = confidence
 
     # Analyze intervals
-    interval_data = analyze_microtonal_intervals(s)
+    interval_data = analyze_microtonal_intervals(notes)
     analysis['microtonal_content'] = interval_data['contains_microtones']
     analysis['interval_characteristics'] = interval_data
 
     # Check against world scales
-    notes = list(s.flatten().notes)
     if notes:
-        pitch_classes = sorted(set((n.pitch.midi % 12) * 100 + n.pitch.microtone.cents for n in notes))
-
-        # Test against various world scales
-        for scale_type in ScaleType:
-            try:
-                world_scale = create_world_music_scale(scale_type, tonic_midi=60)
-                scale_pcs = [c % 1200 for c in world_scale.intervals_cents]
-
-                # Calculate match
-                errors = [min(abs(pc - spc) for spc in scale_pcs) for pc in pitch_classes]
-                avg_error = sum(errors) / len(errors) if errors else float('inf')
-
-                if avg_error < 30:  # Within 30 cents
-                    analysis['possible_scales'].append({
-                        'scale': scale_type.value,
-                        'match_quality': 1.0 - (avg_error / 30.0)
-                    })
-            except:
-                pass
-
-    # Sort by match quality
-    analysis['possible_scales'].sort(key=lambda x: x['match_quality'], reverse=True)
+        pitch_classes = np.unique(_pitch_class_cents(notes))
+
+        # Mean distance to each world scale, one entry per scale type
+        avg_errors = np.fromiter(
+            (_nearest_distance(pitch_classes, _world_scale_pitch_classes(t)).mean()
+             for t in _WORLD_SCALE_TYPES),
+            dtype=np.float64,
+            count=len(_WORLD_SCALE_TYPES)
+        )
+
+        # Keep scales within 30 cents, best match first
+        matches = np.flatnonzero(avg_errors < 30)
+        qualities = 1.0 - avg_errors[matches] / 30.0
+        order = np.argsort(-qualities, kind='stable')
+
+        analysis['possible_scales'] = [
+            {
+                'scale': _WORLD_SCALE_TYPES[matches[k]].value,
+                'match_quality': float(qualities[k])
+            }
+            for k in order
+        ]
 
     return analysis
@@ -6,14 +6,88 @@ and generative assistance using statistical and heuristic methods.
 """
 
 from pathlib import Path
-from typing import Union, Dict, List, Optional, Tuple
+from typing import Union, Dict, Iterator, List, Optional, Tuple
 import random
 from collections import Counter
 import numpy as np
-from music21 import stream, note, chord, interval, key
+from numpy.lib.stride_tricks import sliding_window_view
+from music21 import stream, note, chord, key
 import music21 as m21
 
 
+# Per-note record shared by the analysis functions below
+_NOTE_DTYPE = np.dtype([
+    ('pitch', 'i2'),
+    ('duration', 'f8'),
+    ('offset', 'f8'),
+    ('part', 'i2'),
+])
+
+# Voice relation codes returned by _voice_pair_relation
+_INDEPENDENT, _RETROGRADE, _INVERSION, _STRICT_IMITATION, _FREE_IMITATION = range(5)
+_RELATION_NAMES = ('independent', 'retrograde', 'inversion', 'strict_imitation', 'free_imitation')
+
+# detect_canon_type verdicts in priority order, keyed by the relation bits
+# they require; _CANON_TYPE_BY_MASK resolves every possible bitmask
+_CANON_TYPE_RULES = (
+    ((1 << _RETROGRADE) | (1 << _INVERSION), 'crab_canon', 0.9, 'Detected both retrograde and inversion'),
+    (1 << _RETROGRADE, 'retrograde_canon', 0.85, 'Detected retrograde relationship'),
+    (1 << _INVERSION, 'mirror_canon', 0.85, 'Detected inversion relationship'),
+    (1 << _STRICT_IMITATION, 'strict_canon', 0.8, 'Detected strict imitation'),
+    (1 << _FREE_IMITATION, 'free_canon', 0.6, 'Detected free imitation'),
+    (0, 'polyphonic', 0.5, 'Multiple independent voices'),
+)
+_CANON_TYPE_BY_MASK = {
+    mask: next(rule[1:] for rule in _CANON_TYPE_RULES if mask & rule[0] == rule[0])
+    for mask in range(1 << len(_RELATION_NAMES))
+}
+
+# suggest_continuation parameters per style:
+# (preferred_intervals, preferred_durations, step_probability)
+_CONTINUATION_STYLES = {
+    'baroque': (
+        np.array([-2, -1, 1, 2, 3, -3], dtype=np.int16),
+        np.array([0.5, 1.0, 2.0]),
+        0.7,
+    ),
+    'classical': (
+        np.array([-2, -1, 1, 2, 4, -4], dtype=np.int16),
+        np.array([0.25, 0.5, 1.0, 1.5, 2.0]),
+        0.6,
+    ),
+    'romantic': (
+        np.array([-3, -2, -1, 1, 2, 3, 5, -5], dtype=np.int16),
+        np.array([0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0]),
+        0.5,
+    ),
+}
+_STEP_INTERVALS = np.array([-2, -1, 1, 2], dtype=np.int16)
+
+# classify_style rules over the features (avg_interval, chromatic_ratio,
+# pitch_range, unique_durations); styles are (baroque, classical, romantic)
+_STYLE_RULES = np.array([
+    # Baroque: smaller intervals, less chromatic, moderate range
+    (0, -np.inf, 3.5, False, False, 0.3, 0),
+    (1, -np.inf, 0.15, False, False, 0.3, 0),
+    (2, -np.inf, 20, False, False, 0.2, 0),
+    (3, -np.inf, 4, False, True, 0.2, 0),
+    # Classical: balanced intervals, clear rhythm, moderate chromatic
+    (0, 3.0, 4.5, True, True, 0.3, 1),
+    (1, 0.1, 0.25, True, True, 0.3, 1),
+    (2, 15, 25, True, True, 0.2, 1),
+    (3, 3, 6, True, True, 0.2, 1),
+    # Romantic: larger intervals, more chromatic, wider range
+    (0, 4.0, np.inf, False, False, 0.3, 2),
+    (1, 0.2, np.inf, False, False, 0.3, 2),
+    (2, 20, np.inf, False, False, 0.2, 2),
+    (3, 5, np.inf, False, False, 0.2, 2),
+], dtype=[
+    ('feature', 'i1'), ('lo', 'f8'), ('hi', 'f8'),
+    ('lo_inclusive', '?'), ('hi_inclusive', '?'),
+    ('weight', 'f8'), ('style', 'i1'),
+])
+
+
 # ============================================================================
 # Phase 16: Machine Learning for Canon Analysis
 # ============================================================================
@@ -51,18 +125,9 @@ def analyze_patterns(
         >>> print(f"Found {analysis['num_patterns']} patterns")
     """
     patterns = []
-    pattern_occurrences = {}
 
     # Extract all notes from the score
-    all_notes = []
-    for part in score.parts:
-        for el in part.flatten().notes:
-            if isinstance(el, note.Note):
-                all_notes.append({
-                    'pitch': el.pitch.midi,
-                    'duration': float(el.quarterLength),
-                    'offset': float(el.offset)
-                })
+    all_notes = _score_to_note_array(score)
 
     if len(all_notes) < min_pattern_length:
         return {
@@ -73,35 +138,16 @@ def analyze_patterns(
             'pattern_transitions': {}
         }
 
-    # Find patterns of different lengths
-    for length in range(min_pattern_length, min(max_pattern_length + 1, len(all_notes))):
-        for i in range(len(all_notes) - length + 1):
-            # Create pattern signature (intervals + rhythms)
-            pattern_notes = all_notes[i:i+length]
+    steps = np.diff(all_notes['pitch'].astype(np.float64))
+    all_durations = all_notes['duration']
 
-            # Melodic contour (intervals)
-            intervals = []
-            for j in range(len(pattern_notes) - 1):
-                intervals.append(pattern_notes[j+1]['pitch'] - pattern_notes[j]['pitch'])
-
-            # Rhythmic pattern
-            durations = [n['duration'] for n in pattern_notes]
-
-            # Create pattern signature
-            pattern_sig = (tuple(intervals), tuple(durations))
-
-            if pattern_sig in pattern_occurrences:
-                pattern_occurrences[pattern_sig] += 1
-            else:
-                pattern_occurrences[pattern_sig] = 1
+    # Find patterns of different lengths, one length at a time
+    lengths = range(max(min_pattern_length, 1), min(max_pattern_length + 1, len(all_notes)))
+    total_possible_patterns = sum(len(all_notes) - length + 1 for length in lengths)
 
     # Calculate confidence scores and filter patterns
-    total_possible_patterns = sum(pattern_occurrences.values())
-
-    for pattern_sig, count in pattern_occurrences.items():
-        if count >= 2:  # Pattern appears at least twice
-            intervals_tuple, durations_tuple = pattern_sig
-
+    for length, starts, counts in _repeated_windows(steps, all_durations, lengths):
+        for count, start in zip(counts.tolist(), starts.tolist()):
             # Confidence based on frequency and consistency
             frequency = count / total_possible_patterns
             consistency = min(1.0, count / 5.0)  # More occurrences = higher consistency
@@ -109,11 +155,11 @@ def analyze_patterns(
 
             if confidence >= confidence_threshold:
                 patterns.append({
-                    'intervals': list(intervals_tuple),
-                    'durations': list(durations_tuple),
+                    'intervals': steps[start:start + length - 1].astype(int).tolist(),
+                    'durations': all_durations[start:start + length].tolist(),
                     'occurrences': count,
                     'confidence': confidence,
-                    'length': len(intervals_tuple) + 1
+                    'length': length
                 })
 
     # Sort by confidence
@@ -176,17 +222,25 @@ def classify_style(
             'features': {}
         }
 
+    # One pass over the notes; chords get a NaN pitch so that no interval
+    # is measured across them
+    single_notes = [n for n in all_notes if isinstance(n, note.Note)]
+    is_single = np.fromiter(
+        (isinstance(n, note.Note) for n in all_notes), dtype=bool, count=len(all_notes)
+    )
+    pitch_space = np.full(len(all_notes), np.nan)
+    pitch_space[is_single] = [n.pitch.ps for n in single_notes]
+    durations = np.array([float(n.quarterLength) for n in all_notes])
+    pitches = np.array([n.pitch.midi for n in single_notes], dtype=np.int16)
+
     # Feature 1: Interval complexity
-    intervals_list = []
-    for i in range(len(all_notes) - 1):
-        if isinstance(all_notes[i], note.Note) and isinstance(all_notes[i+1], note.Note):
-            intv = interval.Interval(all_notes[i].pitch, all_notes[i+1].pitch)
-            intervals_list.append(abs(intv.semitones))
+    intervals_list = np.abs(np.diff(pitch_space))
+    intervals_list = intervals_list[~np.isnan(intervals_list)]
 
-    if intervals_list:
+    if len(intervals_list):
         avg_interval = np.mean(intervals_list)
         interval_variance = np.var(intervals_list)
-        large_leaps = sum(1 for i in intervals_list if i > 7) / len(intervals_list)
+        large_leaps = np.count_nonzero(intervals_list > 7) / len(intervals_list)
     else:
         avg_interval = 0
         interval_variance = 0
@@ -197,18 +251,15 @@ def classify_style(
     features['large_leaps'] = large_leaps
 
     # Feature 2: Rhythmic complexity
-    durations = [float(n.quarterLength) for n in all_notes]
-    unique_durations = len(set(durations))
-    duration_variance = np.var(durations) if durations else 0
+    unique_durations = len(np.unique(durations))
+    duration_variance = np.var(durations)
 
     features['unique_durations'] = unique_durations
     features['rhythmic_complexity'] = duration_variance
 
     # Feature 3: Chromatic content
-    pitches = [n.pitch.midi for n in all_notes if isinstance(n, note.Note)]
     if len(pitches) > 1:
-        chromatic_steps = sum(1 for i in range(len(pitches)-1)
-                             if abs(pitches[i+1] - pitches[i]) == 1)
+        chromatic_steps = np.count_nonzero(np.abs(np.diff(pitches)) == 1)
         chromatic_ratio = chromatic_steps / (len(pitches) - 1)
     else:
         chromatic_ratio = 0
@@ -216,47 +267,22 @@ def classify_style(
     features['chromatic_ratio'] = chromatic_ratio
 
     # Feature 4: Range
-    if pitches:
-        pitch_range = max(pitches) - min(pitches)
+    if len(pitches):
+        pitch_range = int(np.ptp(pitches))
     else:
         pitch_range = 0
 
     features['pitch_range'] = pitch_range
 
-    # Simple heuristic classification based on features
-    baroque_score = 0.0
-    classical_score = 0.0
-    romantic_score = 0.0
-
-    # Baroque: smaller intervals, less chromatic, moderate range
-    if avg_interval < 3.5:
-        baroque_score += 0.3
-    if chromatic_ratio < 0.15:
-        baroque_score += 0.3
-    if pitch_range < 20:
-        baroque_score += 0.2
-    if unique_durations <= 4:
-        baroque_score += 0.2
-
-    # Classical: balanced intervals, clear rhythm, moderate chromatic
-    if 3.0 <= avg_interval <= 4.5:
-        classical_score += 0.3
-    if 0.1 <= chromatic_ratio <= 0.25:
-        classical_score += 0.3
-    if 15 <= pitch_range <= 25:
-        classical_score += 0.2
-    if 3 <= unique_durations <= 6:
-        classical_score += 0.2
-
-    # Romantic: larger intervals, more chromatic, wider range
-    if avg_interval > 4.0:
-        romantic_score += 0.3
-    if chromatic_ratio > 0.2:
-        romantic_score += 0.3
-    if pitch_range > 20:
-        romantic_score += 0.2
-    if unique_durations > 5:
-        romantic_score += 0.2
+    # Simple heuristic classification based on features: every rule that
+    # holds adds its weight to its style's score
+    values = np.array([avg_interval, chromatic_ratio, pitch_range, unique_durations], dtype=float)
+    values = values[_STYLE_RULES['feature']]
+    above = np.where(_STYLE_RULES['lo_inclusive'], values >= _STYLE_RULES['lo'], values > _STYLE_RULES['lo'])
+    below = np.where(_STYLE_RULES['hi_inclusive'], values <= _STYLE_RULES['hi'], values < _STYLE_RULES['hi'])
+    baroque_score, classical_score, romantic_score = np.bincount(
+        _STYLE_RULES['style'], weights=(above & below) * _STYLE_RULES['weight'], minlength=3
+    ).tolist()
 
     # Normalize scores
     total = baroque_score + classical_score + romantic_score
@@ -327,66 +353,44 @@ def detect_canon_type(
         }
 
     evidence = []
-    transformations = []
+    transformations = 0  # Bitmask of detected relation codes
     voice_relationships = {}
 
     # Extract notes from each voice
-    voices = []
-    for part in parts:
-        voice_notes = []
-        for el in part.flatten().notes:
-            if isinstance(el, note.Note):
-                voice_notes.append({
-                    'pitch': el.pitch.midi,
-                    'offset': float(el.offset)
-                })
-        voices.append(voice_notes)
-
-    # Analyze pairwise voice relationships
+    all_notes = _score_to_note_array(score)
+    # Records are grouped part by part, so each voice is a view of the
+    # pitch column
+    part_sizes = np.bincount(all_notes['part'], minlength=len(parts))
+    voices = np.split(all_notes['pitch'], np.cumsum(part_sizes)[:-1])
+
+    # Analyze pairwise voice relationships; all pairs are compared in one
+    # batch, then each pair is classified from its match counts
+    lengths = [len(voice) for voice in voices]
+    retrograde, inversion, imitation = (counts.tolist() for counts in _voice_match_counts(voices))
     for i in range(len(voices)):
         for j in range(i + 1, len(voices)):
-            relationship = _analyze_voice_pair(voices[i], voices[j])
-            voice_relationships[f'voice_{i+1}_to_{j+1}'] = relationship
+            code, similarity = _voice_pair_relation(
+                lengths[i], lengths[j], retrograde[i][j], inversion[i][j], imitation[i][j]
+            )
+            relation = _RELATION_NAMES[code]
+            voice_relationships[f'voice_{i+1}_to_{j+1}'] = {'type': relation, 'similarity': similarity}
 
-            if relationship['type'] != 'independent':
-                evidence.append(f"Voice {i+1} and {j+1}: {relationship['type']}")
-                transformations.append(relationship['type'])
+            if code != _INDEPENDENT:
+                evidence.append(f"Voice {i+1} and {j+1}: {relation}")
+                transformations |= 1 << code
 
     # Determine canon type based on evidence
-    canon_type = 'unknown'
-    confidence = 0.0
-
-    if 'retrograde' in transformations and 'inversion' in transformations:
-        canon_type = 'crab_canon'
-        confidence = 0.9
-        evidence.append('Detected both retrograde and inversion')
-    elif 'retrograde' in transformations:
-        canon_type = 'retrograde_canon'
-        confidence = 0.85
-        evidence.append('Detected retrograde relationship')
-    elif 'inversion' in transformations:
-        canon_type = 'mirror_canon'
-        confidence = 0.85
-        evidence.append('Detected inversion relationship')
-    elif 'strict_imitation' in transformations:
-        canon_type = 'strict_canon'
-        confidence = 0.8
-        evidence.append('Detected strict imitation')
-    elif 'free_imitation' in transformations:
-        canon_type = 'free_canon'
-        confidence = 0.6
-        evidence.append('Detected free imitation')
-    else:
-        canon_type = 'polyphonic'
-        confidence = 0.5
-        evidence.append('Multiple independent voices')
+    canon_type, confidence, reason = _CANON_TYPE_BY_MASK[transformations]
+    evidence.append(reason)
 
     return {
         'canon_type': canon_type,
         'confidence': confidence,
         'evidence': evidence,
         'voice_relationships': voice_relationships,
-        'transformations': list(set(transformations))
+        'transformations': [
+            name for code, name in enumerate(_RELATION_NAMES) if transformations & (1 << code)
+        ]
     }
 
 
@@ -417,143 +421,299 @@ def suggest_continuation(
         ... )
     """
     # Extract pattern from theme
-    theme_notes = []
-    for el in theme.flatten().notes:
-        if isinstance(el, note.Note):
-            theme_notes.append({
-                'pitch': el.pitch.midi,
-                'duration': float(el.quarterLength)
-            })
-
-    if not theme_notes:
+    theme_notes = _note_array(theme)
+
+    if not len(theme_notes):
         # Return empty stream if no notes
         return stream.Stream()
 
     # Calculate intervals and durations from theme
-    intervals = []
-    durations = []
+    intervals = np.diff(theme_notes['pitch'])
+    theme_durations = theme_notes['duration']
+
+    # Generate continuation. Random decisions are drawn from a generator
+    # seeded off the random module, so random.seed() still makes the
+    # output reproducible.
+    rng = np.random.default_rng(random.getrandbits(64))
+    params = _CONTINUATION_STYLES.get(style, _CONTINUATION_STYLES['baroque'])
+    target_length = num_measures * 4.0  # Approximate quarter notes
+    new_pitches, new_durations = _generate_continuation(
+        rng, int(theme_notes['pitch'][-1]), target_length,
+        intervals, theme_durations, *params, variation_level
+    )
 
-    for i in range(len(theme_notes) - 1):
-        intervals.append(theme_notes[i+1]['pitch'] - theme_notes[i]['pitch'])
-        durations.append(theme_notes[i]['duration'])
-    if theme_notes:
-        durations.append(theme_notes[-1]['duration'])
-
-    # Style-specific parameters
-    style_params = {
-        'baroque': {
-            'preferred_intervals': [-2, -1, 1, 2, 3, -3],
-            'preferred_durations': [0.5, 1.0, 2.0],
-            'step_probability': 0.7
-        },
-        'classical': {
-            'preferred_intervals': [-2, -1, 1, 2, 4, -4],
-            'preferred_durations': [0.25, 0.5, 1.0, 1.5, 2.0],
-            'step_probability': 0.6
-        },
-        'romantic': {
-            'preferred_intervals': [-3, -2, -1, 1, 2, 3, 5, -5],
-            'preferred_durations': [0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0],
-            'step_probability': 0.5
-        }
-    }
+    continuation = stream.Part()
+    continuation.append([
+        note.Note(next_pitch, quarterLength=next_duration)
+        for next_pitch, next_duration in zip(new_pitches, new_durations)
+    ])
 
-    params = style_params.get(style, style_params['baroque'])
+    return continuation
 
-    # Generate continuation
-    continuation = stream.Part()
-    current_pitch = theme_notes[-1]['pitch']
-    target_length = num_measures * 4.0  # Approximate quarter notes
+
+def _generate_continuation(
+    rng: np.random.Generator,
+    start_pitch: int,
+    target_length: float,
+    theme_intervals: np.ndarray,
+    theme_durations: np.ndarray,
+    preferred_intervals: np.ndarray,
+    preferred_durations: np.ndarray,
+    step_probability: float,
+    variation_level: float
+) -> Tuple[List[int], List[float]]:
+    """
+    Generate continuation pitches and durations (helper function).
+
+    Each note's interval and duration are drawn, a batch of notes at a
+    time, from one weighted pool each that folds the theme-or-style and
+    step-motion choices into its probabilities. A batch covers the target
+    length at the shortest available duration, and is topped up when
+    zero-length durations leave it short.
+
+    Args:
+        rng: Random generator to draw from
+        start_pitch: MIDI pitch the continuation moves away from
+        target_length: Length in quarter notes to reach or just exceed
+        theme_intervals: Intervals of the theme in semitones (may be empty)
+        theme_durations: Durations of the theme in quarter notes
+        preferred_intervals: Style-appropriate intervals in semitones
+        preferred_durations: Style-appropriate durations in quarter notes
+        step_probability: Probability of replacing an interval with a step
+        variation_level: Probability of using style rather than theme material
+
+    Returns:
+        Tuple of (MIDI pitches, durations), one entry per generated note
+    """
+    pitches = []
+    durations = []
+    current_pitch = start_pitch
     current_length = 0.0
 
+    theme_probability = min(max(1 - variation_level, 0.0), 1.0)
+    if not len(theme_intervals):
+        # Without theme intervals, style intervals are used instead
+        interval_theme_probability = 0.0
+    else:
+        interval_theme_probability = theme_probability
+    interval_pool, interval_weights = _weighted_pool(
+        (_STEP_INTERVALS, step_probability),
+        (theme_intervals, (1 - step_probability) * interval_theme_probability),
+        (preferred_intervals, (1 - step_probability) * (1 - interval_theme_probability)),
+    )
+    duration_pool, duration_weights = _weighted_pool(
+        (theme_durations, theme_probability),
+        (preferred_durations, 1 - theme_probability),
+    )
+
+    shortest = min(theme_durations[theme_durations > 0].min(initial=np.inf), preferred_durations.min())
+    batch_size = int(target_length / shortest) + 32
+
     while current_length < target_length:
-        # Choose next interval
-        if random.random() < (1 - variation_level):
-            # Use pattern from theme
-            if intervals:
-                next_interval = random.choice(intervals)
-            else:
-                next_interval = random.choice(params['preferred_intervals'])
-        else:
-            # Use style-appropriate interval
-            next_interval = random.choice(params['preferred_intervals'])
-
-        # Apply step motion preference
-        if random.random() < params['step_probability']:
-            next_interval = random.choice([-2, -1, 1, 2])
-
-        # Choose duration
-        if random.random() < (1 - variation_level) and durations:
-            next_duration = random.choice(durations)
-        else:
-            next_duration = random.choice(params['preferred_durations'])
-
-        # Create next note
-        current_pitch = max(48, min(84, current_pitch + next_interval))  # Stay in range
-        new_note = note.Note(current_pitch, quarterLength=next_duration)
-        continuation.append(new_note)
-
-        current_length += next_duration
+        next_intervals = rng.choice(interval_pool, size=batch_size, p=interval_weights)
+        next_durations = rng.choice(duration_pool, size=batch_size, p=duration_weights)
 
-    return continuation
+        for next_interval, next_duration in zip(next_intervals.tolist(), next_durations.tolist()):
+            current_pitch = max(48, min(84, current_pitch + next_interval))  # Stay in range
+            pitches.append(current_pitch)
+            durations.append(next_duration)
+
+            current_length += next_duration
+            if current_length >= target_length:
+                break
 
+    return pitches, durations
 
-def _analyze_voice_pair(voice1: List[Dict], voice2: List[Dict]) -> Dict[str, any]:
+
+def _weighted_pool(*sources: Tuple[np.ndarray, float]) -> Tuple[np.ndarray, np.ndarray]:
     """
-    Analyze relationship between two voices (helper function).
+    Merge value arrays into one pool with per-value probabilities (helper function).
 
     Args:
-        voice1: List of note dicts from first voice
-        voice2: List of note dicts from second voice
+        sources: Tuples of (values, probability of drawing from them); each
+            source's probability is shared evenly among its values
 
     Returns:
-        Dict with relationship type and similarity score
+        Tuple of (values, probabilities) suitable for ``Generator.choice``
     """
-    if not voice1 or not voice2:
-        return {'type': 'independent', 'similarity': 0.0}
+    nonempty = [(values, probability) for values, probability in sources if len(values)]
+    pool = np.concatenate([values for values, _ in nonempty])
+    weights = np.concatenate([
+        np.full(len(values), probability / len(values)) for values, probability in nonempty
+    ])
+    return pool, weights
 
-    # Extract pitches
-    pitches1 = [n['pitch'] for n in voice1]
-    pitches2 = [n['pitch'] for n in voice2]
 
-    # Check for retrograde (reversed pitches)
-    if len(pitches1) == len(pitches2):
-        retrograde_similarity = sum(
-            1 for i in range(min(10, len(pitches1)))
-            if pitches1[i] == pitches2[-(i+1)]
-        ) / min(10, len(pitches1))
-
-        if retrograde_similarity > 0.7:
-            return {'type': 'retrograde', 'similarity': retrograde_similarity}
-
-    # Check for inversion
-    if len(pitches1) >= 3 and len(pitches2) >= 3:
-        # Calculate intervals
-        intervals1 = [pitches1[i+1] - pitches1[i] for i in range(min(10, len(pitches1)-1))]
-        intervals2 = [pitches2[i+1] - pitches2[i] for i in range(min(10, len(pitches2)-1))]
-
-        # Check if intervals are inverted
-        inversion_matches = sum(
-            1 for i in range(min(len(intervals1), len(intervals2)))
-            if intervals1[i] == -intervals2[i]
+def _note_array(*streams: stream.Stream) -> np.ndarray:
+    """
+    Pack the single notes of one or more streams into a structured array (helper function).
+
+    Notes are found with a lazy recursive search rather than a flattened
+    copy of each stream, reading each note's offset from the hierarchy,
+    and all streams fill one preallocated array.
+
+    Args:
+        streams: Streams to extract, numbered from 0 in the ``part`` field;
+            chords, rests and other elements are skipped
+
+    Returns:
+        Array of ``_NOTE_DTYPE`` records, stream by stream, each in time
+        order as ``flatten()`` would list them
+    """
+    notes = []
+    offsets = []
+    sizes = []
+    for s in streams:
+        start = len(notes)
+        elements = s.recurse().getElementsByClass(note.Note)
+        for el in elements:
+            notes.append(el)
+            offsets.append(float(elements.currentHierarchyOffset()))
+        sizes.append(len(notes) - start)
+
+    arr = np.empty(len(notes), dtype=_NOTE_DTYPE)
+    arr['pitch'] = [el.pitch.midi for el in notes]
+    arr['duration'] = [float(el.quarterLength) for el in notes]
+    arr['offset'] = offsets
+    arr['part'] = np.repeat(np.arange(len(streams)), sizes)
+
+    # Voices and nested parts are visited one after another
+    if np.any((np.diff(arr['offset']) < 0) & (np.diff(arr['part']) == 0)):
+        arr = arr[np.lexsort((arr['offset'], arr['part']))]
+    return arr
+
+
+def _score_to_note_array(score: stream.Score) -> np.ndarray:
+    """
+    Extract the notes of every part of a score in one pass (helper function).
+
+    Args:
+        score: The Score to extract
+
+    Returns:
+        Array of ``_NOTE_DTYPE`` records, part by part in score order
+    """
+    return _note_array(*score.parts)
+
+
+def _repeated_windows(
+    steps: np.ndarray,
+    durations: np.ndarray,
+    lengths: range
+) -> Iterator[Tuple[int, np.ndarray, np.ndarray]]:
+    """
+    Yield the note windows that occur at least twice, per length (helper function).
+
+    A window is the intervals plus durations of ``length`` consecutive
+    notes. Repeated windows are counted with one np.unique call per
+    length. A window can only repeat if its one-note-shorter prefix does,
+    so each length only looks at the starts that repeated at the length
+    before, and the search stops once no start is left.
+
+    Args:
+        steps: Intervals between consecutive notes, as floats
+        durations: Note durations in quarter notes
+        lengths: Ascending window lengths to search
+
+    Yields:
+        Tuples of (length, first start of each repeated window, its
+        occurrence count), ordered by first start
+    """
+    num_notes = len(durations)
+    candidates = np.arange(num_notes)
+    for length in lengths:
+        candidates = candidates[candidates <= num_notes - length]
+        if not len(candidates):
+            return
+        windows = np.hstack([
+            sliding_window_view(steps, length - 1)[candidates],
+            sliding_window_view(durations, length)[candidates],
+        ])
+
+        _, first, inverse, counts = np.unique(
+            windows, axis=0, return_index=True, return_inverse=True, return_counts=True
         )
+        repeated = counts >= 2
+        starts, counts = candidates[first[repeated]], counts[repeated]
+        candidates = candidates[repeated[inverse.ravel()]]
+        order = np.argsort(starts)
+        yield length, starts[order], counts[order]
 
-        if inversion_matches > 0:
-            inversion_similarity = inversion_matches / min(len(intervals1), len(intervals2))
-            if inversion_similarity > 0.6:
-                return {'type': 'inversion', 'similarity': inversion_similarity}
 
-    # Check for strict imitation
-    matching_pitches = sum(
-        1 for i in range(min(10, len(pitches1), len(pitches2)))
-        if pitches1[i] == pitches2[i]
-    )
+def _voice_match_counts(voices: List[np.ndarray]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Count matching notes between every pair of voices at once (helper function).
+
+    Only the first ten notes (or intervals) of each voice are compared.
+    Short voices are padded with values unique to their row, so padding
+    never matches anything.
+
+    Args:
+        voices: Integer arrays of MIDI pitches, one per voice
+
+    Returns:
+        Tuple of (retrograde, inversion, imitation) count matrices; entry
+        [i, j] compares voice i with the reversal, inversion or plain
+        copy of voice j
+    """
+    row_pad = np.arange(len(voices))[:, None]
+    heads = -1 - row_pad + np.zeros(10, dtype=np.int32)
+    tails = heads.copy()
+    steps = 1000 + row_pad + np.zeros(10, dtype=np.int32)
+    for i, pitches in enumerate(voices):
+        k = min(10, len(pitches))
+        heads[i, :k] = pitches[:k]
+        tails[i, :k] = pitches[::-1][:k]
+        intervals = np.diff(pitches[:11])
+        steps[i, :len(intervals)] = intervals
+
+    retrograde = np.count_nonzero(heads[:, None] == tails[None, :], axis=-1)
+    inversion = np.count_nonzero(steps[:, None] == -steps[None, :], axis=-1)
+    imitation = np.count_nonzero(heads[:, None] == heads[None, :], axis=-1)
+    return retrograde, inversion, imitation
+
+
+def _voice_pair_relation(
+    n1: int,
+    n2: int,
+    retrograde_matches: int,
+    inversion_matches: int,
+    imitation_matches: int
+) -> Tuple[int, float]:
+    """
+    Classify two voices from their match counts (helper function).
 
-    if matching_pitches > 0:
-        strict_similarity = matching_pitches / min(10, len(pitches1), len(pitches2))
-        if strict_similarity > 0.8:
-            return {'type': 'strict_imitation', 'similarity': strict_similarity}
-        elif strict_similarity > 0.5:
-            return {'type': 'free_imitation', 'similarity': strict_similarity}
+    Args:
+        n1: Number of notes in the first voice
+        n2: Number of notes in the second voice
+        retrograde_matches: Leading notes of voice 1 matching voice 2 reversed
+        inversion_matches: Leading intervals of voice 1 mirroring voice 2's
+        imitation_matches: Leading notes of voice 1 matching voice 2's
 
-    return {'type': 'independent', 'similarity': 0.0}
+    Returns:
+        Tuple of (relation code indexing ``_RELATION_NAMES``, similarity)
+    """
+    if n1 == 0 or n2 == 0:
+        return _INDEPENDENT, 0.0
+
+    # Check for retrograde (reversed pitches)
+    if n1 == n2:
+        k = min(10, n1)
+        if retrograde_matches / k > 0.7:
+            return _RETROGRADE, retrograde_matches / k
+
+    # Check for inversion (intervals mirrored)
+    if n1 >= 3 and n2 >= 3:
+        k = min(10, n1 - 1, n2 - 1)
+        if inversion_matches > 0 and inversion_matches / k > 0.6:
+            return _INVERSION, inversion_matches / k
+
+    # Check for strict imitation
+    k = min(10, n1, n2)
+    if imitation_matches > 0:
+        if imitation_matches / k > 0.8:
+            return _STRICT_IMITATION, imitation_matches / k
+        elif imitation_matches / k > 0.5:
+            return _FREE_IMITATION, imitation_matches / k
+
+    return _INDEPENDENT, 0.0
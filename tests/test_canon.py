@@ -2580,6 +2580,125 @@ class TestPhase10AdvancedPatternAnalysis:
         assert result['num_motifs'] == 0
         assert result['total_occurrences'] == 0
 
+    def test_detect_motifs_chord_in_motif(self):
+        """Test that a single note after a chord contributes no interval."""
+        from cancrizans import detect_motifs
+        from music21 import stream, note, chord
+
+        score = stream.Score()
+        part = stream.Part()
+
+        # C-[E G]-F repeated; the chord counts as its highest note
+        for _ in range(2):
+            part.append(note.Note('C4', quarterLength=1.0))
+            part.append(chord.Chord(['E4', 'G4'], quarterLength=1.0))
+            part.append(note.Note('F4', quarterLength=1.0))
+
+        score.append(part)
+
+        result = detect_motifs(score, min_length=3, max_length=3)
+
+        assert result['num_motifs'] == 1
+        motif = result['most_common']
+        assert motif['intervals'] == [7]
+        assert motif['example_pitches'] == [60, 67, 65]
+        assert [o['offset'] for o in motif['occurrences']] == [0.0, 3.0]
+
+    def test_detect_motifs_rhythmic_variation(self):
+        """Test that rhythms are part of the signature unless variation is allowed."""
+        from cancrizans import detect_motifs
+        from music21 import stream, note
+
+        score = stream.Score()
+        part = stream.Part()
+
+        # C-D-E in quarters, then in halves
+        for length in [1.0, 2.0]:
+            for p in ['C4', 'D4', 'E4']:
+                part.append(note.Note(p, quarterLength=length))
+
+        score.append(part)
+
+        strict = detect_motifs(score, min_length=3, max_length=3,
+                               allow_rhythmic_variation=False)
+        loose = detect_motifs(score, min_length=3, max_length=3,
+                              allow_rhythmic_variation=True)
+
+        assert strict['num_motifs'] == 0
+        assert loose['num_motifs'] == 1
+        assert [o['offset'] for o in loose['most_common']['occurrences']] == [0.0, 3.0]
+
+    def test_detect_motifs_without_transposition(self):
+        """Test that transposed statements only match when transposition is allowed."""
+        from cancrizans import detect_motifs
+        from music21 import stream, note
+
+        score = stream.Score()
+        part = stream.Part()
+
+        # C-D-E, then D-E-F# (same intervals, different pitches)
+        for p in ['C4', 'D4', 'E4', 'D4', 'E4', 'F#4']:
+            part.append(note.Note(p, quarterLength=1.0))
+
+        score.append(part)
+
+        transposed = detect_motifs(score, min_length=3, max_length=3,
+                                   allow_transposition=True)
+        literal = detect_motifs(score, min_length=3, max_length=3,
+                                allow_transposition=False)
+
+        assert transposed['num_motifs'] == 1
+        assert transposed['most_common']['intervals'] == [2, 2]
+        assert literal['num_motifs'] == 0
+
+    def test_detect_motifs_merges_lengths_by_intervals(self):
+        """Test that windows of different lengths share an interval-only signature."""
+        from cancrizans import detect_motifs
+        from music21 import stream, note, chord
+
+        score = stream.Score()
+        part = stream.Part()
+
+        # C-[E G]-F has the single interval +7, as does the later D-A
+        part.append(note.Note('C4', quarterLength=1.0))
+        part.append(chord.Chord(['E4', 'G4'], quarterLength=1.0))
+        part.append(note.Note('F4', quarterLength=1.0))
+        part.append(note.Note('D5', quarterLength=1.0))
+        part.append(note.Note('A5', quarterLength=1.0))
+
+        score.append(part)
+
+        result = detect_motifs(score, min_length=2, max_length=3,
+                               allow_rhythmic_variation=True)
+
+        sevenths = [m for m in result['motifs'] if m['intervals'] == [7]]
+        assert len(sevenths) == 1
+        occurrences = sevenths[0]['occurrences']
+        assert [(o['offset'], o['pitches']) for o in occurrences] == [
+            (0.0, [60, 67]), (3.0, [74, 81]), (0.0, [60, 67, 65])
+        ]
+
+    def test_detect_motifs_skips_unpitched(self):
+        """Test that elements other than notes and chords are ignored."""
+        from cancrizans import detect_motifs
+        from music21 import stream, note
+
+        score = stream.Score()
+        part = stream.Part()
+
+        for p in ['C4', 'D4', 'E4']:
+            part.append(note.Note(p, quarterLength=1.0))
+        part.append(note.Unpitched(quarterLength=1.0))
+        for p in ['C4', 'D4', 'E4']:
+            part.append(note.Note(p, quarterLength=1.0))
+
+        score.append(part)
+
+        result = detect_motifs(score, min_length=3, max_length=3)
+
+        assert result['num_motifs'] == 1
+        assert [o['offset'] for o in result['most_common']['occurrences']] == [0.0, 4.0]
+
     def test_identify_melodic_sequences_basic(self):
         """Test basic melodic sequence identification."""
         from cancrizans import identify_melodic_sequences
@@ -2702,6 +2821,30 @@ class TestPhase10AdvancedPatternAnalysis:
         # Should handle single part gracefully
         assert result['num_imitations'] == 0
 
+    def test_detect_imitation_points_max_delay_boundary(self):
+        """Test that an answer exactly max_delay later is kept and a later one dropped."""
+        from cancrizans import detect_imitation_points
+        from music21 import stream, note
+
+        def canon_at(delay):
+            score = stream.Score()
+            part1 = stream.Part()
+            part2 = stream.Part()
+            for i, p in enumerate(['C4', 'D4', 'E4']):
+                part1.append(note.Note(p, quarterLength=1.0))
+                part2.insert(delay + i, note.Note(p, quarterLength=1.0))
+            score.append(part1)
+            score.append(part2)
+            return score
+
+        at_limit = detect_imitation_points(canon_at(4.0), min_length=3, max_delay=4.0)
+        past_limit = detect_imitation_points(canon_at(4.25), min_length=3, max_delay=4.0)
+
+        assert at_limit['num_imitations'] == 1
+        assert at_limit['imitation_points'][0]['delay'] == 4.0
+        assert at_limit['imitation_points'][0]['type'] == 'exact'
+        assert past_limit['num_imitations'] == 0
+
     def test_analyze_thematic_development_basic(self):
         """Test basic thematic development analysis."""
         from cancrizans import analyze_thematic_development
@@ -160,6 +160,26 @@ class TestJustIntonation:
         assert abs(scale.intervals_cents[1] - 701.955) < 0.01  # 3:2 fifth
         assert abs(scale.intervals_cents[2] - 1200.0) < 0.01  # 2:1 octave
 
+    def test_repeated_calls_return_independent_scales(self):
+        """Test that cached ratio conversion does not share interval lists"""
+        ratios = [(1, 1), (5, 4), (3, 2)]
+        scale1 = create_just_intonation_scale(ratios)
+        scale1.intervals_cents.append(1200.0)
+
+        scale2 = create_just_intonation_scale(ratios)
+
+        assert len(scale2.intervals_cents) == 3
+        assert abs(scale2.intervals_cents[1] - 386.314) < 0.01  # 5:4 major third
+
+    def test_invalid_ratios_raise(self):
+        """Test that zero and negative ratios are rejected"""
+        with pytest.raises(ZeroDivisionError):
+            create_just_intonation_scale([(1, 1), (1, 0)])
+        with pytest.raises(ValueError):
+            create_just_intonation_scale([(1, 1), (-1, 2)])
+        with pytest.raises(ValueError):
+            create_just_intonation_scale([(0, 1)])
+
 
 class TestPythagorean:
     """Test Pythagorean tuning"""
@@ -436,6 +456,17 @@ class TestTuningDetection:
 
         assert 0.0 <= confidence <= 1.0
 
+    def test_accepts_precomputed_notes(self):
+        """Test that a flattened note list gives the same result as the stream"""
+        s = stream.Stream()
+        for midi in [60, 64, 67]:
+            s.append(note.Note(midi=midi))
+
+        notes = list(s.flatten().notes)
+
+        assert detect_tuning_system(notes) == detect_tuning_system(s)
+        assert analyze_microtonal_intervals(notes) == analyze_microtonal_intervals(s)
+
 
 class TestCrossCulturalAnalysis:
     """Test cross-cultural canon analysis"""
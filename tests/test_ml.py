@@ -2,6 +2,8 @@
 Tests for machine learning and intelligent analysis module (ml.py).
 """
 
+import random
+
 import pytest
 from music21 import stream, note, chord
 from cancrizans import (
@@ -138,6 +140,30 @@ class TestAnalyzePatterns:
         assert isinstance(result_short, dict)
         assert isinstance(result_long, dict)
 
+    def test_analyze_patterns_counts_nested_repeats(self):
+        """Test occurrence counts when prefixes of a repeated pattern recur elsewhere."""
+        score = stream.Score()
+        part = stream.Part()
+        # C-D-E-F twice, with C-D-E and the final C-D step repeating on their own
+        for pitch in [60, 62, 64, 65, 60, 62, 64, 70, 60, 62, 64, 65, 50, 52]:
+            part.append(note.Note(pitch, quarterLength=1.0))
+        score.insert(0, part)
+
+        result = analyze_patterns(score, min_pattern_length=2, confidence_threshold=0.0)
+
+        occurrences = {
+            tuple(pattern['intervals']): pattern['occurrences']
+            for pattern in result['patterns']
+        }
+        assert occurrences == {
+            (2,): 7,
+            (2, 2): 3,
+            (1,): 2,
+            (2, 1): 2,
+            (2, 2, 1): 2,
+        }
+        assert result['most_common']['intervals'] == [2]
+
     def test_analyze_patterns_structure(self, pattern_score):
         """Test the structure of returned pattern data."""
         result = analyze_patterns(pattern_score)
@@ -306,6 +332,26 @@ class TestDetectCanonType:
         if len(list(canon.parts)) >= 2:
             assert len(result['voice_relationships']) > 0
 
+    def test_detect_canon_type_short_voice(self):
+        """Test pairwise relationships when one of three voices is short."""
+        line = [60, 62, 64, 65, 67, 69, 71, 72, 74, 76, 77, 79]
+        score = stream.Score()
+        # Full line, its first four notes only, and the full line reversed
+        for pitches in [line, line[:4], line[::-1]]:
+            part = stream.Part()
+            for pitch in pitches:
+                part.append(note.Note(pitch, quarterLength=1.0))
+            score.insert(0, part)
+
+        result = detect_canon_type(score)
+
+        assert result['voice_relationships'] == {
+            'voice_1_to_2': {'type': 'strict_imitation', 'similarity': 1.0},
+            'voice_1_to_3': {'type': 'retrograde', 'similarity': 1.0},
+            'voice_2_to_3': {'type': 'independent', 'similarity': 0.0},
+        }
+        assert result['canon_type'] == 'retrograde_canon'
+
     def test_detect_canon_type_evidence(self, simple_theme):
         """Test that evidence is provided."""
         canon = assemble_crab_from_theme(simple_theme)
@@ -405,6 +451,19 @@ class TestSuggestContinuation:
         if pitches:
             assert all(48 <= p <= 84 for p in pitches)
 
+    def test_suggest_continuation_reproducible_with_seed(self, simple_theme):
+        """Test that seeding the random module reproduces the continuation."""
+        random.seed(1234)
+        first = suggest_continuation(simple_theme, num_measures=4)
+        random.seed(1234)
+        second = suggest_continuation(simple_theme, num_measures=4)
+
+        def signature(s):
+            return [(n.pitch.midi, float(n.quarterLength)) for n in s.flatten().notes]
+
+        assert signature(first) == signature(second)
+        assert sum(float(n.quarterLength) for n in first.flatten().notes) >= 16.0
+
 
 class TestMLIntegration:
     """Integration tests for ML functions."""